@@ -14,7 +14,10 @@ FEATURE_ENGINEERED_FILE = "processed_data/engineered_features.csv"
 RUL_PREDICTIONS_FILE = "processed_data/rul_predictions.csv"
 REGRESSION_MODEL_PATH = "trained_models/regression_model.pkl"
 LSTM_MODEL_PATH = "trained_models/lstm_model.h5"
+SHARED_FOREST_DIR = "trained_models/shared_forest/"
 EDA_OUTPUT_DIR = "eda_plots/"
+TELEMETRY_STORE_DIR = "processed_data/telemetry_store/"
+FEATURE_STORE_DIR = "processed_data/feature_store/"
 
 # Model Training Parameters
 TEST_SIZE = 0.2  # Proportion of data to use for testing
@@ -25,16 +28,36 @@ LSTM_EPOCHS = 10
 LSTM_BATCH_SIZE = 32
 LSTM_UNITS = 50
 
+# Time Alignment Parameters
+RESAMPLE_FREQ = "1min"  # Bucket width for time alignment
+GAP_THRESHOLD = "10min"  # Gaps longer than this start a new segment
+FILL_LIMIT = 2  # Maximum number of consecutive empty buckets filled inside a segment
+FILL_METHOD = "linear"  # "linear" interpolation or "ffill"
+
 # Feature Engineering Parameters
 ROLLING_WINDOW_SIZE = 5  # Window size for rolling averages
 LAGS = [1, 2, 3]  # Lag intervals for lagged features
 
+# Telemetry Store Parameters
+STORE_BLOCK_ROWS = 4096  # Rows per block in the sparse time-range index
+STORE_MAX_SEGMENTS = 8  # Beyond this count the smallest segments are merged until at most this many remain
+
 # Flask Deployment
 FLASK_HOST = '0.0.0.0'
 FLASK_PORT = 5000
 FLASK_DEBUG = True
 
+# Multi-Worker Serving
+SERVING_WORKERS = None  # Number of pre-forked worker processes; None uses one per CPU core
+
 # Dashboard Configuration
 DASHBOARD_HOST = '127.0.0.1'
 DASHBOARD_PORT = 8050
 DASHBOARD_DEBUG = True
+SCHEDULE_API_URL = "http://127.0.0.1:5000/schedule"  # Live maintenance schedule polled by the dashboard
+SCHEDULE_REFRESH_SECONDS = 30
+
+# Maintenance Scheduler
+SCHEDULER_DEFAULT_URGENCY = 1.0  # Multiplier applied to RUL; values above 1.0 move a vehicle forward in the queue
+SCHEDULER_TOP_K = 20
+SCHEDULER_HORIZON_DAYS = 7
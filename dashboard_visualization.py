@@ -7,18 +7,30 @@ and maintenance schedules for fleet management. Uses Dash for web-based visualiz
 Author: Satej
 """
 
+import json
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
 import pandas as pd
 import plotly.graph_objects as go
+from maintenance_scheduler import DEFAULT_TOP_K
+from telemetry_store import TelemetryStore, FEATURE_STORE_DIR
 
 # Configuration for file paths
-INPUT_FILE = "processed_data/engineered_features.csv"
 RUL_PREDICTIONS_FILE = "processed_data/rul_predictions.csv"
+DEFAULT_WINDOW_DAYS = 7  # Initial time window shown for the selected vehicle
+SCHEDULE_API_URL = "http://127.0.0.1:5000/schedule"  # Live maintenance scheduler served by model_deployment
+SCHEDULE_REFRESH_SECONDS = 30
+SCHEDULE_API_TIMEOUT = 5  # Seconds
 
-# Load data
-df = pd.read_csv(INPUT_FILE)
+# Load data; telemetry history is read on demand from the indexed feature store
+store = TelemetryStore(FEATURE_STORE_DIR)
+vehicles = store.vehicles()
+first_time, last_time = store.time_bounds()
 rul_predictions = pd.read_csv(RUL_PREDICTIONS_FILE)
 
 # Initialize Dash app
@@ -28,28 +40,58 @@ app = dash.Dash(__name__)
 app.layout = html.Div([
     html.H1("EV Battery Health Dashboard", style={"textAlign": "center"}),
 
+    html.Label("Select Vehicle and Time Window:"),
+    dcc.Dropdown(
+        id='vehicle-dropdown',
+        options=[{'label': vehicle, 'value': vehicle} for vehicle in vehicles],
+        value=vehicles[0] if vehicles else None,
+        style={"width": "50%"}
+    ),
+    dcc.DatePickerRange(
+        id='time-window',
+        min_date_allowed=first_time,
+        max_date_allowed=last_time,
+        start_date=max(first_time, last_time - pd.Timedelta(days=DEFAULT_WINDOW_DAYS)) if last_time else None,
+        end_date=last_time
+    ),
+
     dcc.Graph(id='soc-over-time'),
     dcc.Graph(id='rul-distribution'),
 
+    html.Label("Number of Vehicles to Schedule:"),
+    dcc.Slider(id='schedule-top-k', min=5, max=100, step=5, value=DEFAULT_TOP_K),
+    dcc.Graph(id='maintenance-schedule'),
+    dcc.Interval(id='schedule-refresh', interval=SCHEDULE_REFRESH_SECONDS * 1000),
+
     html.Label("Select Feature for Analysis:"),
     dcc.Dropdown(
         id='feature-dropdown',
-        options=[{'label': col, 'value': col} for col in df.columns if col != 'timestamp'],
+        options=[{'label': col, 'value': col} for col in store.columns],
         value='state_of_charge',
         style={"width": "50%"}
     ),
     dcc.Graph(id='feature-visualization')
 ])
 
+def load_window(vehicle_id, start_date, end_date, columns):
+    """
+    Reads the selected vehicle and time window from the feature store.
+    """
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1) if end_date else None
+    return store.query(vehicle_id, start_date, end, columns)
+
 # Callbacks for dynamic updates
 @app.callback(
     Output('soc-over-time', 'figure'),
-    Input('feature-dropdown', 'value')
+    Input('vehicle-dropdown', 'value'),
+    Input('time-window', 'start_date'),
+    Input('time-window', 'end_date')
 )
-def update_soc_graph(selected_feature):
+def update_soc_graph(vehicle_id, start_date, end_date):
     """
-    Updates the SOC over time graph based on user selection.
+    Updates the SOC over time graph for the selected vehicle and time window.
     """
+    df = load_window(vehicle_id, start_date, end_date, ['state_of_charge'])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df['timestamp'], y=df['state_of_charge'], mode='lines', name='SOC'))
     fig.update_layout(
@@ -76,14 +118,47 @@ def update_rul_distribution(selected_feature):
     )
     return fig
 
+@app.callback(
+    Output('maintenance-schedule', 'figure'),
+    Input('schedule-top-k', 'value'),
+    Input('schedule-refresh', 'n_intervals')
+)
+def update_maintenance_schedule(top_k, n_intervals):
+    """
+    Shows the most urgent vehicles from the live maintenance scheduler behind the /schedule API.
+    """
+    fig = go.Figure()
+    try:
+        with urlopen(f"{SCHEDULE_API_URL}?{urlencode({'k': top_k})}", timeout=SCHEDULE_API_TIMEOUT) as response:
+            due_vehicles = json.load(response)["vehicles"]
+    except (URLError, OSError, ValueError, KeyError) as e:
+        fig.update_layout(title=f"Maintenance schedule unavailable: {e}")
+        return fig
+
+    fig.add_trace(go.Bar(
+        x=[v['vehicle_id'] for v in due_vehicles],
+        y=[v['priority'] for v in due_vehicles],
+        name='Effective RUL'
+    ))
+    fig.update_layout(
+        title=f"Top {top_k} Vehicles Due for Maintenance",
+        xaxis_title="Vehicle",
+        yaxis_title="Effective RUL"
+    )
+    return fig
+
 @app.callback(
     Output('feature-visualization', 'figure'),
-    Input('feature-dropdown', 'value')
+    Input('feature-dropdown', 'value'),
+    Input('vehicle-dropdown', 'value'),
+    Input('time-window', 'start_date'),
+    Input('time-window', 'end_date')
 )
-def update_feature_graph(selected_feature):
+def update_feature_graph(selected_feature, vehicle_id, start_date, end_date):
     """
-    Visualizes the selected feature over time.
+    Visualizes the selected feature over time for the selected vehicle and time window.
     """
+    df = load_window(vehicle_id, start_date, end_date, [selected_feature])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df['timestamp'], y=df[selected_feature], mode='lines', name=selected_feature))
     fig.update_layout(
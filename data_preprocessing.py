@@ -9,11 +9,19 @@ Author: Satej
 
 import pandas as pd
 import numpy as np
+from telemetry_store import save_to_store, TELEMETRY_STORE_DIR
 
 # Configuration for input and output paths
 INPUT_FILE = "data/battery_telemetry.csv"  # Replace with the actual file path
 OUTPUT_FILE = "processed_data/cleaned_telemetry.csv"
 
+# Resampling parameters
+VEHICLE_ID_COL = "vehicle_id"
+RESAMPLE_FREQ = "1min"  # Bucket width for time alignment
+GAP_THRESHOLD = "10min"  # Gaps longer than this start a new segment
+FILL_LIMIT = 2  # Maximum number of consecutive empty buckets filled inside a segment
+FILL_METHOD = "linear"  # "linear" interpolation or "ffill"
+
 def load_data(file_path):
     """
     Load telemetry data from a CSV file.
@@ -54,23 +62,90 @@ def clean_data(df):
 
     return df
 
-def align_time_series(df, time_col):
+def align_time_series(df, time_col, freq=RESAMPLE_FREQ, vehicle_col=VEHICLE_ID_COL, gap_threshold=GAP_THRESHOLD,
+                      fill_limit=FILL_LIMIT, fill_method=FILL_METHOD, sparse=True):
     """
     Align time-series data to ensure uniform timestamps across sensors.
 
+    In sparse mode each vehicle's data is split into segments wherever consecutive readings are more than
+    `gap_threshold` apart, and only occupied buckets are emitted. Up to `fill_limit` empty buckets following an
+    occupied one are filled inside a segment, so a parked vehicle or a bad timestamp never materializes long runs
+    of empty rows. A 'segment_id' column identifies the segments for downstream windowed features.
+
     Args:
         df (pd.DataFrame): Telemetry data.
         time_col (str): Name of the timestamp column.
+        freq (str): Fixed bucket width, e.g. "1min" or "30s".
+        vehicle_col (str): Name of the vehicle identifier column; ignored if the column is absent.
+        gap_threshold (str): Gap between readings above which a new segment starts.
+        fill_limit (int): Maximum number of consecutive empty buckets filled after an occupied bucket.
+        fill_method (str): "linear" to interpolate filled buckets or "ffill" to carry the last value forward.
+        sparse (bool): If False, resample the whole frame onto a dense grid instead.
 
     Returns:
         pd.DataFrame: Time-aligned telemetry data.
     """
-    # Convert the timestamp column to datetime
-    df[time_col] = pd.to_datetime(df[time_col])
+    if fill_method not in ("linear", "ffill"):
+        raise ValueError(f"Unsupported fill method: {fill_method}")
 
-    # Resample data to 1-minute intervals
-    df = df.set_index(time_col).resample('1T').mean().reset_index()
-    print("Time-series data aligned to 1-minute intervals.")
+    # Convert the timestamp column to datetime
+    df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
+
+    if not sparse:
+        df = df.set_index(time_col).resample(freq).mean().reset_index()
+        print(f"Time-series data aligned to {freq} intervals.")
+        return df
+
+    invalid = df[time_col].isna()
+    if invalid.any():
+        df = df[~invalid]
+        print(f"Dropped {int(invalid.sum())} rows with invalid timestamps.")
+    if df.empty:
+        return df
+
+    keys = [vehicle_col] if vehicle_col in df.columns else []
+    value_cols = [col for col in df.select_dtypes(include=[np.number]).columns if col not in keys]
+    df = df.sort_values(keys + [time_col], kind='stable')
+
+    # Start a new segment for every vehicle and at every gap above the threshold
+    boundaries = df[time_col].diff() > pd.Timedelta(gap_threshold)
+    if keys:
+        boundaries |= df[vehicle_col].ne(df[vehicle_col].shift())
+    boundaries.iloc[0] = True
+    segment_ids = boundaries.cumsum() - 1
+
+    # Average readings into occupied buckets only
+    df = df.assign(segment_id=segment_ids, **{time_col: df[time_col].dt.floor(freq)})
+    df = df.groupby(keys + ['segment_id', time_col], sort=True)[value_cols].mean().reset_index()
+
+    # Fill short runs of empty buckets inside each segment
+    if fill_limit > 0 and len(df) > 1:
+        step = np.timedelta64(pd.Timedelta(freq))
+        times = df[time_col].to_numpy()
+        segments = df['segment_id'].to_numpy()
+        steps = np.zeros(len(df), dtype=np.int64)
+        steps[:-1] = (times[1:] - times[:-1]) // step
+        steps[:-1][segments[1:] != segments[:-1]] = 0
+        counts = np.clip(steps - 1, 0, fill_limit)
+
+        if counts.sum() > 0:
+            rows = np.repeat(np.arange(len(df)), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+            values = df[value_cols].to_numpy(dtype=float)
+            filled_values = values[rows]
+            if fill_method == "linear":
+                fraction = (offsets / steps[rows])[:, None]
+                filled_values = filled_values + (values[rows + 1] - filled_values) * fraction
+
+            filled = pd.DataFrame(filled_values, columns=value_cols)
+            for col in keys + ['segment_id']:
+                filled[col] = df[col].to_numpy()[rows]
+            filled[time_col] = times[rows] + offsets * step
+            df = pd.concat([df, filled[df.columns]], ignore_index=True)
+            df = df.sort_values(['segment_id', time_col], kind='stable').reset_index(drop=True)
+
+    print(f"Time-series data aligned to {freq} intervals: {len(df)} buckets in "
+          f"{int(df['segment_id'].nunique())} segments.")
 
     return df
 
@@ -100,5 +175,8 @@ def main():
     # Save the processed data
     save_processed_data(processed_data, OUTPUT_FILE)
 
+    # Index the processed data for time-range queries
+    save_to_store(processed_data, TELEMETRY_STORE_DIR)
+
 if __name__ == "__main__":
     main()
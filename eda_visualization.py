@@ -10,11 +10,17 @@ Author: Satej
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from telemetry_store import TelemetryStore, TELEMETRY_STORE_DIR
 
 # Configuration for file paths
 INPUT_FILE = "processed_data/cleaned_telemetry.csv"
 OUTPUT_DIR = "eda_plots/"
 
+# Optional window for the analysis (None means the full history)
+VEHICLE_ID = None
+START_TIME = None
+END_TIME = None
+
 def load_data(file_path):
     """
     Load processed telemetry data from a CSV file.
@@ -33,6 +39,27 @@ def load_data(file_path):
         print(f"File not found: {file_path}")
         return None
 
+def load_history(store_dir, vehicle_id=None, start=None, end=None):
+    """
+    Load a time window of telemetry data from the indexed telemetry store.
+
+    Args:
+        store_dir (str): Directory of the telemetry store.
+        vehicle_id: Optional vehicle identifier; all vehicles when None.
+        start: Optional inclusive start time.
+        end: Optional inclusive end time.
+
+    Returns:
+        pd.DataFrame: Telemetry data in the window, or None if the store is empty.
+    """
+    store = TelemetryStore(store_dir)
+    if not len(store):
+        print(f"Telemetry store not found or empty: {store_dir}")
+        return None
+    data = store.query(vehicle_id, start, end)
+    print(f"Loaded {len(data)} rows from telemetry store {store_dir}")
+    return data
+
 def plot_battery_health(df):
     """
     Plot battery health metrics such as state of charge (SOC) over time.
@@ -83,8 +110,10 @@ def plot_correlations(df):
     plt.close()
 
 def main():
-    # Load the cleaned telemetry data
-    data = load_data(INPUT_FILE)
+    # Load the cleaned telemetry data, preferring the indexed store over the full CSV
+    data = load_history(TELEMETRY_STORE_DIR, VEHICLE_ID, START_TIME, END_TIME)
+    if data is None:
+        data = load_data(INPUT_FILE)
     if data is None:
         return
 
@@ -8,11 +8,16 @@ Author: Satej
 """
 
 import pandas as pd
+from telemetry_store import save_to_store, FEATURE_STORE_DIR
 
 # Configuration for file paths
 INPUT_FILE = "processed_data/cleaned_telemetry.csv"
 OUTPUT_FILE = "processed_data/engineered_features.csv"
 
+# Columns written by data_preprocessing.align_time_series; features are computed per group when present
+VEHICLE_ID_COL = "vehicle_id"
+SEGMENT_COL = "segment_id"
+
 def calculate_depth_of_discharge(df):
     """
     Calculate the Depth of Discharge (DoD) based on the state of charge (SOC).
@@ -44,7 +49,7 @@ def calculate_charge_discharge_rates(df):
 
 def cumulative_energy_throughput(df):
     """
-    Calculate the cumulative energy throughput over time.
+    Calculate the cumulative energy throughput over time, per vehicle when a vehicle column is present.
 
     Args:
         df (pd.DataFrame): Telemetry data.
@@ -52,13 +57,17 @@ def cumulative_energy_throughput(df):
     Returns:
         pd.DataFrame: Data with an additional 'cumulative_energy' column.
     """
-    df['cumulative_energy'] = (df['voltage'] * df['current']).cumsum()
+    energy = df['voltage'] * df['current']
+    if VEHICLE_ID_COL in df.columns:
+        df['cumulative_energy'] = energy.groupby(df[VEHICLE_ID_COL]).cumsum()
+    else:
+        df['cumulative_energy'] = energy.cumsum()
     print("Cumulative energy throughput calculated.")
     return df
 
 def add_rolling_features(df, column, window_size):
     """
-    Add rolling average features to capture temporal patterns.
+    Add rolling average features to capture temporal patterns. Windows never span segment gaps.
 
     Args:
         df (pd.DataFrame): Telemetry data.
@@ -69,13 +78,18 @@ def add_rolling_features(df, column, window_size):
         pd.DataFrame: Data with an additional rolling average column.
     """
     rolling_col_name = f"{column}_rolling_avg_{window_size}"
-    df[rolling_col_name] = df[column].rolling(window=window_size).mean()
+    if SEGMENT_COL in df.columns:
+        df[rolling_col_name] = (
+            df.groupby(SEGMENT_COL)[column].rolling(window=window_size).mean().reset_index(level=0, drop=True)
+        )
+    else:
+        df[rolling_col_name] = df[column].rolling(window=window_size).mean()
     print(f"Rolling average feature '{rolling_col_name}' created.")
     return df
 
 def add_lagged_features(df, column, lags):
     """
-    Add lagged features to model temporal dependencies.
+    Add lagged features to model temporal dependencies. Lags never reach across segment gaps.
 
     Args:
         df (pd.DataFrame): Telemetry data.
@@ -87,7 +101,10 @@ def add_lagged_features(df, column, lags):
     """
     for lag in lags:
         lag_col_name = f"{column}_lag_{lag}"
-        df[lag_col_name] = df[column].shift(lag)
+        if SEGMENT_COL in df.columns:
+            df[lag_col_name] = df.groupby(SEGMENT_COL)[column].shift(lag)
+        else:
+            df[lag_col_name] = df[column].shift(lag)
         print(f"Lagged feature '{lag_col_name}' created.")
     return df
 
@@ -109,5 +126,8 @@ def main():
     df.to_csv(OUTPUT_FILE, index=False)
     print(f"Engineered features saved to {OUTPUT_FILE}")
 
+    # Index the engineered features for time-range queries
+    save_to_store(df, FEATURE_STORE_DIR)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,383 @@
+"""
+maintenance_scheduler.py
+
+This script maintains an indexed priority queue of fleet vehicles ordered by predicted Remaining Useful Life (RUL)
+and urgency. It supports incremental updates as new predictions arrive, top-k and threshold queries, and
+capacity-aware assignment of maintenance slots per service center, without re-sorting the full predictions table.
+
+Author: Satej
+"""
+
+import heapq
+import math
+import threading
+
+import pandas as pd
+
+# Configuration for the scheduler
+RUL_PREDICTIONS_FILE = "processed_data/rul_predictions.csv"
+DEFAULT_URGENCY = 1.0  # Multiplier applied to RUL; values above 1.0 move a vehicle forward in the queue
+DEFAULT_TOP_K = 20
+
+class MaintenanceScheduler:
+    """
+    Indexed binary min-heap of vehicles keyed by effective RUL (predicted RUL divided by urgency).
+
+    The heap position of every vehicle is tracked in a dictionary, so inserting, updating or removing a single
+    vehicle costs O(log n) and never requires sorting the whole fleet. Vehicle identifiers are stored as strings.
+    """
+
+    def __init__(self):
+        self._heap = []      # List of [priority, vehicle_id]
+        self._index = {}     # vehicle_id -> position in self._heap
+        self._records = {}   # vehicle_id -> {"rul", "urgency", "service_center"}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, vehicle_id):
+        return str(vehicle_id) in self._index
+
+    @staticmethod
+    def _priority(rul, urgency):
+        """
+        Compute the effective RUL used to order the queue (lower means more urgent).
+        """
+        return float(rul) / max(float(urgency), 1e-9)
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][1]] = i
+        self._index[heap[j][1]] = j
+
+    def _sift_up(self, pos):
+        heap = self._heap
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if heap[pos][0] >= heap[parent][0]:
+                break
+            self._swap(pos, parent)
+            pos = parent
+
+    def _sift_down(self, pos):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = pos
+            left, right = 2 * pos + 1, 2 * pos + 2
+            if left < size and heap[left][0] < heap[smallest][0]:
+                smallest = left
+            if right < size and heap[right][0] < heap[smallest][0]:
+                smallest = right
+            if smallest == pos:
+                break
+            self._swap(pos, smallest)
+            pos = smallest
+
+    def _rebuild(self):
+        """
+        Re-heapify all entries by priority in O(n) and refresh the position index.
+        """
+        self._index = {vehicle_id: pos for pos, (_, vehicle_id) in enumerate(self._heap)}
+        for pos in range(len(self._heap) // 2 - 1, -1, -1):
+            self._sift_down(pos)
+
+    def _prepare(self, vehicle_id, rul, urgency=None, service_center=None):
+        """
+        Validate and convert one prediction against the current state without modifying it.
+
+        Returns:
+            tuple: (vehicle_id, record, priority).
+
+        Raises:
+            ValueError: If the vehicle identifier, RUL or urgency is missing, not numeric or not finite, or if the
+                urgency is not positive.
+        """
+        if vehicle_id is None:
+            raise ValueError("Prediction is missing 'vehicle_id'")
+        vehicle_id = str(vehicle_id)
+        previous = self._records.get(vehicle_id, {})
+        if urgency is None:
+            urgency = previous.get("urgency", DEFAULT_URGENCY)
+        if service_center is None:
+            service_center = previous.get("service_center")
+        try:
+            rul, urgency = float(rul), float(urgency)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid RUL or urgency for vehicle {vehicle_id}: rul={rul!r}, urgency={urgency!r}")
+        if not (math.isfinite(rul) and math.isfinite(urgency) and urgency > 0):
+            raise ValueError(f"RUL and urgency must be finite and urgency positive for vehicle {vehicle_id}: "
+                             f"rul={rul!r}, urgency={urgency!r}")
+        record = {"rul": rul, "urgency": urgency, "service_center": service_center}
+        return vehicle_id, record, self._priority(rul, urgency)
+
+    def _apply(self, vehicle_id, record, priority):
+        """
+        Store a prepared prediction and restore the heap order in O(log n).
+        """
+        self._records[vehicle_id] = record
+        pos = self._index.get(vehicle_id)
+        if pos is None:
+            self._heap.append([priority, vehicle_id])
+            pos = len(self._heap) - 1
+            self._index[vehicle_id] = pos
+            self._sift_up(pos)
+            return
+
+        old_priority = self._heap[pos][0]
+        self._heap[pos][0] = priority
+        if priority < old_priority:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    def _record(self, vehicle_id):
+        entry = dict(self._records[vehicle_id])
+        entry["vehicle_id"] = vehicle_id
+        entry["priority"] = self._heap[self._index[vehicle_id]][0]
+        return entry
+
+    def update(self, vehicle_id, rul, urgency=None, service_center=None):
+        """
+        Insert a vehicle or update its predicted RUL in O(log n).
+
+        Args:
+            vehicle_id: Unique identifier of the vehicle.
+            rul (float): Latest predicted Remaining Useful Life.
+            urgency (float): Optional urgency multiplier; keeps the previous value when omitted.
+            service_center (str): Optional home service center; keeps the previous value when omitted.
+
+        Raises:
+            ValueError: If the RUL or urgency is not numeric or not finite.
+        """
+        with self._lock:
+            self._apply(*self._prepare(vehicle_id, rul, urgency, service_center))
+
+    def update_many(self, records):
+        """
+        Apply a batch of predictions, e.g. from batch scoring.
+
+        Every record is validated before any of them is applied, so a bad record rejects the whole batch and leaves
+        the scheduler unchanged. Small batches are then applied one by one in O(m log n); batches comparable to the
+        fleet size are written in place and the heap is rebuilt once in O(n).
+
+        Args:
+            records (iterable): Dictionaries with 'vehicle_id', 'rul' and optional 'urgency'/'service_center'.
+
+        Raises:
+            ValueError: If any record is malformed.
+        """
+        records = list(records)
+        with self._lock:
+            prepared = []
+            for record in records:
+                if not isinstance(record, dict):
+                    raise ValueError(f"Prediction must be an object, got {record!r}")
+                prepared.append(self._prepare(record.get("vehicle_id"), record.get("rul"),
+                                              record.get("urgency"), record.get("service_center")))
+
+            if len(prepared) < max(len(self._heap) // 4, 1):
+                for vehicle_id, record, priority in prepared:
+                    self._apply(vehicle_id, record, priority)
+                return
+
+            for vehicle_id, record, priority in prepared:
+                self._records[vehicle_id] = record
+                pos = self._index.get(vehicle_id)
+                if pos is None:
+                    self._index[vehicle_id] = len(self._heap)
+                    self._heap.append([priority, vehicle_id])
+                else:
+                    self._heap[pos][0] = priority
+            self._rebuild()
+        print(f"Scheduler rebuilt with {len(self._heap)} vehicles.")
+
+    def remove(self, vehicle_id):
+        """
+        Remove a vehicle from the queue in O(log n).
+
+        Args:
+            vehicle_id: Unique identifier of the vehicle.
+
+        Returns:
+            bool: True if the vehicle was present.
+        """
+        vehicle_id = str(vehicle_id)
+        with self._lock:
+            pos = self._index.pop(vehicle_id, None)
+            if pos is None:
+                return False
+            del self._records[vehicle_id]
+            last = self._heap.pop()
+            if pos < len(self._heap):
+                self._heap[pos] = last
+                self._index[last[1]] = pos
+                self._sift_up(pos)
+                self._sift_down(self._index[last[1]])
+            return True
+
+    def get(self, vehicle_id):
+        """
+        Return the scheduling record of a single vehicle, or None if unknown.
+        """
+        vehicle_id = str(vehicle_id)
+        with self._lock:
+            if vehicle_id not in self._index:
+                return None
+            return self._record(vehicle_id)
+
+    def _iter_by_priority(self):
+        """
+        Lazily yield heap positions in priority order using an auxiliary frontier heap.
+
+        Producing the first k entries costs O(k log k) regardless of the fleet size. Callers must hold the lock.
+        """
+        heap = self._heap
+        if not heap:
+            return
+        frontier = [(heap[0][0], 0)]
+        while frontier:
+            _, pos = heapq.heappop(frontier)
+            yield pos
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], child))
+
+    def top_k(self, k=DEFAULT_TOP_K):
+        """
+        Return the k most urgent vehicles.
+
+        Args:
+            k (int): Number of vehicles to return.
+
+        Returns:
+            list: Scheduling records ordered from most to least urgent.
+        """
+        with self._lock:
+            result = []
+            for pos in self._iter_by_priority():
+                if len(result) >= k:
+                    break
+                result.append(self._record(self._heap[pos][1]))
+            return result
+
+    def below_threshold(self, threshold, limit=None):
+        """
+        Return all vehicles whose effective RUL is at or below a threshold.
+
+        Only heap subtrees whose root satisfies the threshold are visited, so the cost is proportional to the
+        number of matches rather than the fleet size.
+
+        Args:
+            threshold (float): Maximum effective RUL.
+            limit (int): Optional maximum number of records to return.
+
+        Returns:
+            list: Scheduling records ordered from most to least urgent.
+        """
+        with self._lock:
+            result = []
+            for pos in self._iter_by_priority():
+                if self._heap[pos][0] > threshold:
+                    break
+                if limit is not None and len(result) >= limit:
+                    break
+                result.append(self._record(self._heap[pos][1]))
+            return result
+
+    def assign_slots(self, capacities, horizon_days=7):
+        """
+        Assign maintenance slots in priority order, respecting the daily capacity of each service center.
+
+        Each vehicle is booked on the earliest day with a free slot at its home service center. Vehicles without
+        a home center go to the center with the most remaining capacity. Vehicles whose center is fully booked
+        over the horizon are left unscheduled. Iteration stops as soon as every center is full.
+
+        Args:
+            capacities (dict): Service center -> number of slots per day.
+            horizon_days (int): Number of days to plan ahead.
+
+        Returns:
+            dict: {'assignments': [...], 'unscheduled': [...]} where each assignment carries 'day' and
+            'service_center'.
+        """
+        remaining = {center: [int(slots)] * horizon_days for center, slots in capacities.items()}
+        totals = {center: int(slots) * horizon_days for center, slots in capacities.items()}
+        open_centers = {center for center, total in totals.items() if total > 0}
+        assignments, unscheduled = [], []
+
+        with self._lock:
+            for pos in self._iter_by_priority():
+                if not open_centers:
+                    break
+                record = self._record(self._heap[pos][1])
+                center = record["service_center"]
+                if center is None:
+                    center = max(open_centers, key=lambda c: totals[c])
+                if center not in open_centers:
+                    unscheduled.append(record)
+                    continue
+
+                day = next(d for d, free in enumerate(remaining[center]) if free > 0)
+                remaining[center][day] -= 1
+                totals[center] -= 1
+                if totals[center] == 0:
+                    open_centers.discard(center)
+
+                record["service_center"] = center
+                record["day"] = day
+                assignments.append(record)
+
+        print(f"Assigned {len(assignments)} maintenance slots across {len(capacities)} service centers.")
+        return {"assignments": assignments, "unscheduled": unscheduled}
+
+    @classmethod
+    def from_dataframe(cls, df, id_col="vehicle_id", rul_col="rul"):
+        """
+        Build a scheduler from a predictions table in O(n). Rows with a missing or non-finite RUL or urgency are
+        skipped.
+
+        Args:
+            df (pd.DataFrame): Predictions with an RUL column and optional 'urgency'/'service_center' columns.
+            id_col (str): Vehicle identifier column; the row index is used when it is missing.
+            rul_col (str): Predicted RUL column.
+
+        Returns:
+            MaintenanceScheduler: Populated scheduler.
+        """
+        scheduler = cls()
+        ruls = pd.to_numeric(df[rul_col], errors='coerce')
+        urgencies = (pd.to_numeric(df["urgency"], errors='coerce') if "urgency" in df.columns
+                     else pd.Series(DEFAULT_URGENCY, index=df.index))
+        valid = (ruls.abs() < math.inf) & (urgencies.abs() < math.inf) & (urgencies > 0)
+        if not valid.all():
+            print(f"Skipped {int((~valid).sum())} predictions with a missing or non-finite RUL or urgency.")
+            df, ruls, urgencies = df[valid], ruls[valid], urgencies[valid]
+
+        ids = df[id_col] if id_col in df.columns else df.index
+        centers = df["service_center"] if "service_center" in df.columns else [None] * len(df)
+        scheduler.update_many(
+            {"vehicle_id": vehicle_id, "rul": rul, "urgency": urgency, "service_center": center}
+            for vehicle_id, rul, urgency, center in zip(ids, ruls, urgencies, centers)
+        )
+        return scheduler
+
+def load_scheduler(file_path=RUL_PREDICTIONS_FILE):
+    """
+    Load RUL predictions from a CSV file into a new scheduler.
+
+    Args:
+        file_path (str): Path to the predictions CSV file.
+
+    Returns:
+        MaintenanceScheduler: Populated scheduler (empty if the file does not exist).
+    """
+    try:
+        df = pd.read_csv(file_path)
+        print(f"RUL predictions loaded successfully from {file_path}")
+    except FileNotFoundError:
+        print(f"File not found: {file_path}")
+        return MaintenanceScheduler()
+    return MaintenanceScheduler.from_dataframe(df)
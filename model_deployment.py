@@ -7,22 +7,85 @@ for EV batteries based on telemetry data. The API can be integrated with externa
 Author: Satej
 """
 
+import threading
+
 from flask import Flask, request, jsonify
 import pandas as pd
 import joblib  # For loading the regression model
-import tensorflow as tf  # For loading the LSTM model
+from maintenance_scheduler import load_scheduler, DEFAULT_TOP_K
+from telemetry_store import TelemetryStore, FEATURE_STORE_DIR
 
 # Configuration for model paths
 REGRESSION_MODEL_PATH = "trained_models/regression_model.pkl"
 LSTM_MODEL_PATH = "trained_models/lstm_model.h5"
 
-# Load the trained models
-regression_model = joblib.load(REGRESSION_MODEL_PATH)
-lstm_model = tf.keras.models.load_model(LSTM_MODEL_PATH)
+# Trained models, loaded on first use (or injected by model_serving in pre-forked workers)
+regression_model = None
+lstm_model = None
+models_lock = threading.Lock()
+
+# Maintenance scheduler seeded from the latest batch predictions on first use and kept current by /predict.
+# Pre-forked workers set it to a proxy for the single scheduler process run by model_serving.
+scheduler = None
+scheduler_lock = threading.Lock()
+
+# Indexed history of engineered features for time-range queries
+history_store = TelemetryStore(FEATURE_STORE_DIR)
 
 # Initialize Flask app
 app = Flask(__name__)
 
+def load_models(shared_regression_model=None, single_threaded=False):
+    """
+    Load the trained models into this process.
+
+    TensorFlow is imported here rather than at module level so that pre-forked workers initialize it after the
+    fork instead of inheriting the parent's TensorFlow runtime.
+
+    Args:
+        shared_regression_model: Optional regression model already loaded by a parent process (e.g. a
+            SharedForestRegressor backed by shared memory). The pickled model is loaded when omitted.
+        single_threaded (bool): Restrict TensorFlow to one thread, for use with one worker process per core.
+    """
+    with models_lock:
+        _load_models(shared_regression_model, single_threaded)
+
+def _load_models(shared_regression_model=None, single_threaded=False):
+    global regression_model, lstm_model
+    import tensorflow as tf  # For loading the LSTM model
+
+    if single_threaded:
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    loaded_regression_model = shared_regression_model
+    if loaded_regression_model is None:
+        loaded_regression_model = joblib.load(REGRESSION_MODEL_PATH)
+    loaded_lstm_model = tf.keras.models.load_model(LSTM_MODEL_PATH)
+
+    # Publish both models together so concurrent requests never see a half-loaded pair
+    regression_model, lstm_model = loaded_regression_model, loaded_lstm_model
+    print("Models loaded.")
+
+def get_models():
+    """
+    Return the (regression, LSTM) model pair, loading it once on first use.
+    """
+    with models_lock:
+        if regression_model is None or lstm_model is None:
+            _load_models()
+        return regression_model, lstm_model
+
+def get_scheduler():
+    """
+    Return the maintenance scheduler, loading it from the latest batch predictions on first use.
+    """
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = load_scheduler()
+        return scheduler
+
 @app.route('/predict', methods=['POST'])
 def predict_rul():
     """
@@ -32,6 +95,9 @@ def predict_rul():
 
     Example Input:
     {
+        "vehicle_id": "EV-001",          # Optional; updates the maintenance schedule when provided
+        "urgency": 1.0,                  # Optional urgency multiplier
+        "service_center": "center-a",    # Optional home service center
         "telemetry": {
             "feature1": value1,
             "feature2": value2,
@@ -51,6 +117,8 @@ def predict_rul():
         # Convert input data to DataFrame
         input_df = pd.DataFrame([input_data])
 
+        regression_model, lstm_model = get_models()
+
         # Predict using regression model
         regression_prediction = regression_model.predict(input_df)[0]
 
@@ -61,6 +129,12 @@ def predict_rul():
         # Combine predictions (example: simple average)
         final_prediction = (regression_prediction + lstm_prediction) / 2
 
+        # Keep the maintenance schedule current
+        vehicle_id = request.json.get("vehicle_id")
+        if vehicle_id is not None:
+            get_scheduler().update(vehicle_id, final_prediction,
+                            request.json.get("urgency"), request.json.get("service_center"))
+
         return jsonify({
             "rul_prediction": final_prediction,
             "details": {
@@ -71,5 +145,120 @@ def predict_rul():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/history', methods=['GET'])
+def get_history():
+    """
+    API endpoint returning the telemetry history of a vehicle within a time range.
+
+    Query Parameters:
+        vehicle_id (str): Vehicle identifier.
+        start (str): Inclusive start time, e.g. "2023-01-01T00:00:00" (optional).
+        end (str): Inclusive end time (optional).
+        columns (str): Comma-separated list of columns to return (optional, defaults to all).
+
+    Returns:
+        JSON response with the matching rows ordered by timestamp.
+    """
+    try:
+        vehicle_id = request.args.get("vehicle_id")
+        if vehicle_id is None and history_store.vehicle_col is not None:
+            return jsonify({"error": "No vehicle_id provided"}), 400
+
+        columns = request.args.get("columns")
+        columns = columns.split(",") if columns else None
+        unknown = [col for col in columns or [] if col not in history_store.columns]
+        if unknown:
+            return jsonify({"error": f"Unknown columns: {unknown}"}), 400
+
+        try:
+            start, end = (pd.Timestamp(request.args[arg]) if request.args.get(arg) else None
+                          for arg in ("start", "end"))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid start or end time: {e}"}), 400
+
+        history = history_store.query(vehicle_id, start, end, columns)
+        history[history_store.time_col] = history[history_store.time_col].astype(str)
+        history = history.astype(object).where(history.notna(), None)
+        return jsonify({"vehicle_id": vehicle_id, "rows": history.to_dict(orient="records")})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/schedule', methods=['GET'])
+def get_schedule():
+    """
+    API endpoint returning the most urgent vehicles.
+
+    Query Parameters:
+        k (int): Number of vehicles to return (default 20).
+        threshold (float): If given, return every vehicle with an effective RUL at or below this value instead.
+
+    Returns:
+        JSON response with the vehicles ordered from most to least urgent.
+    """
+    try:
+        scheduler = get_scheduler()
+        threshold = request.args.get("threshold", type=float)
+        if threshold is not None:
+            vehicles = scheduler.below_threshold(threshold, limit=request.args.get("k", type=int))
+        else:
+            vehicles = scheduler.top_k(request.args.get("k", DEFAULT_TOP_K, type=int))
+        return jsonify({"fleet_size": len(scheduler), "vehicles": vehicles})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/schedule/update', methods=['POST'])
+def update_schedule():
+    """
+    API endpoint to push batch-scored RUL predictions into the maintenance schedule.
+
+    Example Input:
+    {
+        "predictions": [
+            {"vehicle_id": "EV-001", "rul": 120.5, "urgency": 1.0, "service_center": "center-a"},
+            ...
+        ]
+    }
+
+    Returns:
+        JSON response with the number of updated vehicles.
+    """
+    try:
+        predictions = request.json.get("predictions", [])
+        if not predictions:
+            return jsonify({"error": "No predictions provided"}), 400
+
+        scheduler = get_scheduler()
+        scheduler.update_many(predictions)
+        return jsonify({"updated": len(predictions), "fleet_size": len(scheduler)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/schedule/assign', methods=['POST'])
+def assign_schedule():
+    """
+    API endpoint to assign maintenance slots given the daily capacity of each service center.
+
+    Example Input:
+    {
+        "capacities": {"center-a": 10, "center-b": 4},
+        "horizon_days": 7
+    }
+
+    Returns:
+        JSON response with the slot assignments and the vehicles left unscheduled.
+    """
+    try:
+        capacities = request.json.get("capacities", {})
+        if not capacities:
+            return jsonify({"error": "No service center capacities provided"}), 400
+
+        return jsonify(get_scheduler().assign_slots(capacities, request.json.get("horizon_days", 7)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
+    load_models()
+    get_scheduler()
     app.run(host='0.0.0.0', port=5000, debug=True)
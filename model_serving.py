@@ -0,0 +1,373 @@
+"""
+model_serving.py
+
+This script serves the prediction API from several pre-forked worker processes. The parent process loads the
+Random Forest once, flattens the node arrays of all its trees into memory-mapped files and forks the workers,
+which read those arrays straight from the shared page cache instead of each holding its own copy of the model.
+The maintenance scheduler lives in a single manager process, and every worker forwards its scheduler calls there
+so all workers see the same schedule.
+
+Author: Satej
+"""
+
+import gc
+import json
+import os
+import shutil
+import signal
+import socket
+import time
+import traceback
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager, BaseProxy
+
+import joblib
+import numpy as np
+
+from maintenance_scheduler import load_scheduler, DEFAULT_TOP_K
+
+# Configuration for multi-worker serving
+REGRESSION_MODEL_PATH = "trained_models/regression_model.pkl"
+SHARED_FOREST_DIR = "trained_models/shared_forest/"
+SERVING_HOST = '0.0.0.0'
+SERVING_PORT = 5000
+SERVING_WORKERS = None  # None uses one worker per CPU core
+LISTEN_BACKLOG = 128
+MIN_WORKER_UPTIME = 10  # Seconds; workers exiting sooner count as failed starts
+MAX_FAILED_STARTS = 5  # Consecutive failed starts before the server gives up
+MAX_RESPAWN_DELAY = 30  # Seconds; cap on the exponential backoff between failed starts
+
+FOREST_ARRAYS = ["children_left", "children_right", "feature", "threshold", "value", "roots"]
+FOREST_META_FILE = "forest.json"
+FOREST_KEEP_VERSIONS = 2  # Exported versions kept on disk, so processes still loading the previous one can finish
+
+class SharedForestRegressor:
+    """
+    Read-only Random Forest regressor backed by memory-mapped node arrays.
+
+    The nodes of every tree are concatenated into flat arrays, so all processes that open the same directory
+    share a single copy of the forest through the operating system's page cache. Predictions match
+    RandomForestRegressor.predict.
+
+    Each export is written to a new versioned subdirectory and published by atomically replacing forest.json, so
+    a re-export never modifies files that running servers have mapped.
+    """
+
+    def __init__(self, arrays, meta):
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.feature_names = meta["feature_names"]
+        self.max_depth = meta["max_depth"]
+
+    @classmethod
+    def load(cls, directory=SHARED_FOREST_DIR):
+        """
+        Attach to the latest forest exported with export_forest without copying its arrays.
+
+        Args:
+            directory (str): Directory holding the exported forest.
+
+        Returns:
+            SharedForestRegressor: Forest backed by memory-mapped arrays.
+        """
+        with open(os.path.join(directory, FOREST_META_FILE), 'r') as file:
+            meta = json.load(file)
+        version_dir = os.path.join(directory, meta["version"])
+        arrays = {name: np.load(os.path.join(version_dir, name + ".npy"), mmap_mode='r') for name in FOREST_ARRAYS}
+        return cls(arrays, meta)
+
+    def predict(self, X):
+        """
+        Predict the target for each row by walking all trees at once.
+
+        Args:
+            X (pd.DataFrame or np.array): Input features.
+
+        Returns:
+            np.array: Predictions averaged over all trees.
+        """
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[self.feature_names]
+        # Scikit-learn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+
+        nodes = np.repeat(np.asarray(self.roots)[:, None], X.shape[0], axis=1)
+        rows = np.broadcast_to(np.arange(X.shape[0]), nodes.shape)
+        for _ in range(self.max_depth):
+            left = self.children_left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+            features = np.where(internal, self.feature[nodes], 0)
+            go_left = X[rows, features] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+
+        predictions = self.value[nodes].mean(axis=0)
+        return predictions[:, 0] if predictions.shape[1] == 1 else predictions
+
+class SchedulerProxy(BaseProxy):
+    """
+    Worker-side handle that forwards MaintenanceScheduler calls to the scheduler process.
+    """
+
+    _exposed_ = ("update", "update_many", "remove", "get", "top_k", "below_threshold", "assign_slots", "__len__")
+
+    def update(self, vehicle_id, rul, urgency=None, service_center=None):
+        return self._callmethod("update", (vehicle_id, rul, urgency, service_center))
+
+    def update_many(self, records):
+        return self._callmethod("update_many", (list(records),))
+
+    def remove(self, vehicle_id):
+        return self._callmethod("remove", (vehicle_id,))
+
+    def get(self, vehicle_id):
+        return self._callmethod("get", (vehicle_id,))
+
+    def top_k(self, k=DEFAULT_TOP_K):
+        return self._callmethod("top_k", (k,))
+
+    def below_threshold(self, threshold, limit=None):
+        return self._callmethod("below_threshold", (threshold, limit))
+
+    def assign_slots(self, capacities, horizon_days=7):
+        return self._callmethod("assign_slots", (capacities, horizon_days))
+
+    def __len__(self):
+        return self._callmethod("__len__")
+
+class SchedulerManager(BaseManager):
+    """
+    Manager hosting the single MaintenanceScheduler shared by all workers.
+    """
+
+_scheduler = None
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = load_scheduler()
+    return _scheduler
+
+SchedulerManager.register("get_scheduler", callable=_get_scheduler, proxytype=SchedulerProxy)
+
+def export_forest(model, directory=SHARED_FOREST_DIR):
+    """
+    Flatten the trees of a fitted RandomForestRegressor into .npy files that can be memory-mapped.
+
+    The arrays are written to a new versioned subdirectory, which is then published by atomically replacing
+    forest.json. Files of earlier versions are never overwritten, only unlinked, which leaves them readable by
+    processes that still have them mapped.
+
+    Args:
+        model (RandomForestRegressor): Fitted forest.
+        directory (str): Output directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith("forest_") and os.path.isdir(os.path.join(directory, name))
+    )
+    next_version = int(versions[-1].split("_")[1]) + 1 if versions else 0
+    version = f"forest_{next_version:06d}"
+    tmp_dir = os.path.join(directory, version + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)  # Left behind by an interrupted export
+    os.makedirs(tmp_dir)
+
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+    arrays = {
+        "children_left": np.concatenate([
+            np.where(tree.children_left == -1, -1, tree.children_left + offset)
+            for tree, offset in zip(trees, offsets)
+        ]).astype(np.int64),
+        "children_right": np.concatenate([
+            np.where(tree.children_right == -1, -1, tree.children_right + offset)
+            for tree, offset in zip(trees, offsets)
+        ]).astype(np.int64),
+        "feature": np.concatenate([tree.feature for tree in trees]).astype(np.int64),
+        "threshold": np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        "value": np.concatenate([tree.value[:, :, 0] for tree in trees]).astype(np.float64),
+        "roots": offsets.astype(np.int64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), array)
+    os.rename(tmp_dir, os.path.join(directory, version))
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    meta = {
+        "version": version,
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "max_depth": int(max(tree.max_depth for tree in trees)),
+    }
+    meta_path = os.path.join(directory, FOREST_META_FILE)
+    with open(meta_path + ".tmp", 'w') as file:
+        json.dump(meta, file, indent=4)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    for old_version in versions[:len(versions) + 1 - FOREST_KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, old_version), ignore_errors=True)
+    print(f"Forest with {len(trees)} trees exported to {os.path.join(directory, version)}")
+
+def load_shared_forest(model_path=REGRESSION_MODEL_PATH, directory=SHARED_FOREST_DIR):
+    """
+    Attach to the exported forest, exporting it first if it is missing, older than the pickled model or written
+    in the earlier unversioned layout.
+
+    Args:
+        model_path (str): Path to the pickled RandomForestRegressor.
+        directory (str): Directory of the exported forest.
+
+    Returns:
+        SharedForestRegressor: Forest backed by memory-mapped arrays.
+    """
+    meta_path = os.path.join(directory, FOREST_META_FILE)
+    stale = not os.path.exists(meta_path) or os.path.getmtime(meta_path) < os.path.getmtime(model_path)
+    if not stale:
+        with open(meta_path, 'r') as file:
+            stale = "version" not in json.load(file)
+    if stale:
+        model = joblib.load(model_path)
+        export_forest(model, directory)
+        del model
+        gc.collect()
+    return SharedForestRegressor.load(directory)
+
+def run_worker(sock, forest, scheduler_address, authkey):
+    """
+    Serve the Flask app on an inherited listening socket. Runs inside a forked worker and never returns.
+    """
+    from werkzeug.serving import make_server
+    import model_deployment
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    manager = SchedulerManager(address=scheduler_address, authkey=authkey)
+    manager.connect()
+    model_deployment.scheduler = manager.get_scheduler()
+
+    model_deployment.load_models(shared_regression_model=forest, single_threaded=True)
+    server = make_server(SERVING_HOST, SERVING_PORT, model_deployment.app, fd=sock.fileno())
+    print(f"Worker {os.getpid()} serving requests.")
+    server.serve_forever()
+
+def spawn_worker(sock, forest, scheduler_address, authkey):
+    """
+    Fork a worker process and return its pid.
+    """
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock, forest, scheduler_address, authkey)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(1)
+    return pid
+
+def serve(host=SERVING_HOST, port=SERVING_PORT, workers=SERVING_WORKERS):
+    """
+    Load the models once, then fork worker processes sharing the forest and a single listening socket.
+
+    Workers that exit unexpectedly are replaced. Workers that die within MIN_WORKER_UPTIME seconds of starting are
+    replaced with exponential backoff, and after MAX_FAILED_STARTS such failures in a row the server shuts down.
+    SIGINT or SIGTERM stops all workers. The maintenance scheduler runs in its own manager process so that the
+    /schedule endpoints answer consistently whichever worker handles the request; if that process dies the
+    workers can no longer serve the schedule, so the server shuts down with an error.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        workers (int): Number of worker processes; one per CPU core when None.
+    """
+    workers = workers or os.cpu_count() or 1
+    forest = load_shared_forest()
+
+    # Host the one maintenance scheduler that all workers forward to
+    authkey = os.urandom(32)
+    scheduler_manager = SchedulerManager(authkey=authkey, ctx=get_context("fork"))
+    scheduler_manager.start()
+    scheduler_manager.get_scheduler()  # Load predictions before workers start
+    scheduler_pid = scheduler_manager._process.pid
+
+    # Import the app before forking so workers share its read-only state
+    import model_deployment  # noqa: F401
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+
+    # Keep the garbage collector from touching, and so copying, objects inherited from the parent
+    gc.collect()
+    gc.freeze()
+
+    children = {}  # pid -> start time
+    for _ in range(workers):
+        children[spawn_worker(sock, forest, scheduler_manager.address, authkey)] = time.monotonic()
+    print(f"Serving on {host}:{port} with {workers} workers.")
+
+    stopping = False
+    failed_starts = 0
+    scheduler_failed = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid == scheduler_pid:
+            # os.wait also reaps the manager process, which is not one of the workers
+            if not stopping:
+                print(f"Scheduler process exited with code {os.waitstatus_to_exitcode(status)}; shutting down.")
+                scheduler_failed = True
+                stop(None, None)
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+
+        uptime = time.monotonic() - started
+        print(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)} after {uptime:.1f}s.")
+        if uptime >= MIN_WORKER_UPTIME:
+            failed_starts = 0
+        else:
+            failed_starts += 1
+            if failed_starts >= MAX_FAILED_STARTS:
+                print(f"Workers failed to start {failed_starts} times in a row; shutting down.")
+                stop(None, None)
+                continue
+            delay = min(2 ** (failed_starts - 1), MAX_RESPAWN_DELAY)
+            print(f"Restarting worker in {delay}s.")
+            time.sleep(delay)
+            if stopping:
+                continue
+        children[spawn_worker(sock, forest, scheduler_manager.address, authkey)] = time.monotonic()
+
+    sock.close()
+    scheduler_manager.shutdown()
+    print("All workers stopped.")
+    if failed_starts >= MAX_FAILED_STARTS or scheduler_failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    serve()
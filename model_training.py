@@ -86,7 +86,7 @@ def main():
     print(f"Data loaded from {INPUT_FILE}")
 
     # Define features and target variable
-    X = df.drop(columns=['remaining_useful_life'])
+    X = df.drop(columns=['remaining_useful_life', 'vehicle_id', 'segment_id'], errors='ignore')
     y = df['remaining_useful_life']
 
     # Train-test split
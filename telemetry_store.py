@@ -0,0 +1,492 @@
+"""
+telemetry_store.py
+
+This script provides a time-range indexed storage layer for telemetry and engineered features. Rows are kept sorted
+by (vehicle, timestamp) in fixed-width binary segments with a sparse block index, so a query such as "vehicle X
+between T1 and T2" binary-searches the index and reads only the matching blocks through a memory map instead of
+loading and filtering a whole CSV file.
+
+Author: Satej
+"""
+
+import copy
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Configuration for the store
+TELEMETRY_STORE_DIR = "processed_data/telemetry_store/"
+FEATURE_STORE_DIR = "processed_data/feature_store/"
+TIME_COL = "timestamp"
+VEHICLE_ID_COL = "vehicle_id"
+BLOCK_ROWS = 4096  # Rows per block in the sparse index
+MAX_SEGMENTS = 8  # Beyond this count the smallest segments are merged until at most this many remain
+CSV_CHUNK_SIZE = 500000  # Rows read per chunk when building a store from CSV
+
+META_FILE = "meta.json"
+KEY_DTYPE = np.dtype([("vehicle", "<i8"), ("timestamp", "<i8")])
+MIN_NS = np.iinfo("<i8").min
+MAX_NS = np.iinfo("<i8").max
+
+class TelemetryStore:
+    """
+    Append-only store of telemetry rows sorted by (vehicle, timestamp).
+
+    Each append is sorted and written as an immutable segment made of a binary record file and a sparse index
+    holding the key of the first row of every block. Range queries search the sparse index of each segment,
+    memory-map only the candidate blocks and trim them with a second binary search.
+
+    'meta.json' lists the live segments and is only ever replaced atomically, after the segments it names have been
+    written. Segment names are never reused, and open stores reload the metadata whenever the file changes, so
+    long-lived readers stay consistent while another process appends to or rebuilds the store.
+    """
+
+    def __init__(self, directory, time_col=TIME_COL, vehicle_col=VEHICLE_ID_COL, block_rows=BLOCK_ROWS):
+        """
+        Open the store in a directory, creating an empty one if none exists.
+
+        Args:
+            directory (str): Directory holding the store files.
+            time_col (str): Name of the timestamp column (used when creating a new store).
+            vehicle_col (str): Name of the vehicle identifier column (used when creating a new store).
+            block_rows (int): Rows per block in the sparse index (used when creating a new store).
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cache = {}  # segment name -> (memmap, sparse index)
+        self._defaults = {"time_col": time_col, "vehicle_col": vehicle_col, "block_rows": block_rows}
+        self._meta_stamp = None
+        self._meta = self._empty_meta(0)
+        self._vehicle_codes = {}
+        self._refresh()
+
+    def _empty_meta(self, next_segment):
+        return dict(self._defaults, columns=None, vehicles=[], segments=[], next_segment=next_segment)
+
+    def _meta_path(self):
+        return os.path.join(self.directory, META_FILE)
+
+    def _refresh(self):
+        """
+        Reload the metadata if 'meta.json' was replaced since it was last read.
+        """
+        try:
+            stat = os.stat(self._meta_path())
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._meta_stamp:
+            return
+        with open(self._meta_path(), 'r') as file:
+            meta = json.load(file)
+        live = {segment["name"] for segment in meta["segments"]}
+        self._cache = {name: cached for name, cached in self._cache.items() if name in live}
+        self._vehicle_codes = {vehicle: code for code, vehicle in enumerate(meta["vehicles"])}
+        self._meta = meta
+        self._meta_stamp = stamp
+
+    def _snapshot(self):
+        """
+        Return a consistent (metadata, vehicle codes) pair reflecting the latest committed state.
+        """
+        with self._lock:
+            self._refresh()
+            return self._meta, self._vehicle_codes
+
+    @property
+    def columns(self):
+        """
+        list: Numeric value columns held by the store.
+        """
+        return list(self._snapshot()[0]["columns"] or [])
+
+    @property
+    def time_col(self):
+        return self._snapshot()[0]["time_col"]
+
+    @property
+    def vehicle_col(self):
+        return self._snapshot()[0]["vehicle_col"]
+
+    def vehicles(self):
+        """
+        Return the identifiers of all vehicles in the store.
+        """
+        return list(self._snapshot()[0]["vehicles"])
+
+    def __len__(self):
+        return sum(segment["rows"] for segment in self._snapshot()[0]["segments"])
+
+    @staticmethod
+    def _record_dtype(meta):
+        return np.dtype(KEY_DTYPE.descr + [(col, "<f8") for col in meta["columns"]])
+
+    def _commit(self, meta, vehicle_codes):
+        """
+        Atomically publish new metadata. Callers must hold the lock.
+        """
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(meta, file, indent=4)
+        os.replace(tmp_path, self._meta_path())
+        stat = os.stat(self._meta_path())
+        self._meta, self._vehicle_codes = meta, vehicle_codes
+        self._meta_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _segment(self, segment, meta):
+        """
+        Return the memory map and sparse index of a segment, opening them on first use.
+        """
+        name = segment["name"]
+        cached = self._cache.get(name)
+        if cached is None:
+            records = np.memmap(os.path.join(self.directory, name + ".bin"), dtype=self._record_dtype(meta),
+                                mode='r', shape=(segment["rows"],))
+            index = np.load(os.path.join(self.directory, name + ".idx.npy"))
+            cached = (records, index)
+            self._cache[name] = cached
+        return cached
+
+    def _write_segment(self, records, meta):
+        """
+        Write sorted records as a new segment and return its metadata entry.
+        """
+        name = f"segment_{meta['next_segment']:06d}"
+        meta["next_segment"] += 1
+        block_rows = meta["block_rows"]
+
+        records.tofile(os.path.join(self.directory, name + ".bin"))
+        index = np.empty(len(records[::block_rows]), dtype=KEY_DTYPE)
+        index["vehicle"] = records["vehicle"][::block_rows]
+        index["timestamp"] = records["timestamp"][::block_rows]
+        np.save(os.path.join(self.directory, name + ".idx.npy"), index)
+        return {
+            "name": name,
+            "rows": len(records),
+            "min_timestamp": int(records["timestamp"].min()),
+            "max_timestamp": int(records["timestamp"].max()),
+        }
+
+    def _remove_segments(self, segments):
+        for segment in segments:
+            self._cache.pop(segment["name"], None)
+            for suffix in (".bin", ".idx.npy"):
+                try:
+                    os.remove(os.path.join(self.directory, segment["name"] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def _to_records(self, df, meta, vehicle_codes):
+        """
+        Convert a DataFrame to sorted store records, registering new vehicles in the given metadata.
+        """
+        time_col, vehicle_col = meta["time_col"], meta["vehicle_col"]
+        timestamps = pd.to_datetime(df[time_col])
+        valid = timestamps.notna().to_numpy()
+        if not valid.all():
+            print(f"Dropped {int((~valid).sum())} rows with invalid timestamps.")
+            df, timestamps = df[valid], timestamps[valid]
+
+        if meta["columns"] is None:
+            if vehicle_col not in df.columns:
+                meta["vehicle_col"] = vehicle_col = None
+            meta["columns"] = [
+                col for col in df.select_dtypes(include=[np.number]).columns if col not in (time_col, vehicle_col)
+            ]
+        missing = [col for col in meta["columns"] if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns missing from appended data: {missing}")
+
+        if vehicle_col is not None:
+            if vehicle_col not in df.columns:
+                raise ValueError(f"Vehicle column '{vehicle_col}' missing from appended data")
+            local_codes, uniques = pd.factorize(df[vehicle_col].astype(str))
+            store_codes = np.empty(len(uniques), dtype="<i8")
+            for pos, vehicle in enumerate(uniques):
+                code = vehicle_codes.get(vehicle)
+                if code is None:
+                    code = len(meta["vehicles"])
+                    meta["vehicles"].append(vehicle)
+                    vehicle_codes[vehicle] = code
+                store_codes[pos] = code
+            codes = store_codes[local_codes]
+        else:
+            codes = np.zeros(len(df), dtype="<i8")
+
+        records = np.empty(len(df), dtype=self._record_dtype(meta))
+        records["vehicle"] = codes
+        records["timestamp"] = timestamps.to_numpy(dtype="datetime64[ns]").view("<i8")
+        for col in meta["columns"]:
+            records[col] = df[col].to_numpy(dtype="<f8", na_value=np.nan)
+        return records[np.lexsort((records["timestamp"], records["vehicle"]))]
+
+    def _merge(self, segments, meta):
+        """
+        Write the rows of several segments as one sorted segment held in memory while it is written.
+        """
+        records = np.concatenate([self._segment(segment, meta)[0] for segment in segments])
+        records = records[np.lexsort((records["timestamp"], records["vehicle"]))]
+        return self._write_segment(records, meta)
+
+    def _merge_smallest(self, segments, meta, max_segments=MAX_SEGMENTS):
+        """
+        Merge the smallest segments together until at most max_segments remain, and return the new segment list.
+
+        Each merge only holds its own group of segments in memory, so merging chunked data never loads all of it
+        at once. Merged-away segments are not removed here.
+        """
+        if len(segments) <= max_segments:
+            return segments
+        groups = [[segment] for segment in segments]
+        while len(groups) > max_segments:
+            groups.sort(key=lambda group: sum(segment["rows"] for segment in group))
+            groups = [groups[0] + groups[1]] + groups[2:]
+        return [group[0] if len(group) == 1 else self._merge(group, meta) for group in groups]
+
+    def append(self, df):
+        """
+        Append telemetry rows to the store as a new sorted segment.
+
+        Args:
+            df (pd.DataFrame): Telemetry rows with a timestamp column, numeric value columns and, optionally,
+                a vehicle identifier column.
+        """
+        if df.empty:
+            return
+        with self._lock:
+            self._refresh()
+            os.makedirs(self.directory, exist_ok=True)
+            meta, vehicle_codes = copy.deepcopy(self._meta), dict(self._vehicle_codes)
+            records = self._to_records(df, meta, vehicle_codes)
+            if not len(records):
+                return
+            meta["segments"] = meta["segments"] + [self._write_segment(records, meta)]
+            self._commit(meta, vehicle_codes)
+            print(f"Appended {len(records)} rows to {self.directory}")
+            if len(meta["segments"]) > MAX_SEGMENTS:
+                old_segments = meta["segments"]
+                meta = copy.deepcopy(meta)
+                meta["segments"] = self._merge_smallest(old_segments, meta)
+                self._commit(meta, vehicle_codes)
+                self._remove_segments([s for s in old_segments if s not in meta["segments"]])
+                print(f"Compacted {len(old_segments)} segments into {len(meta['segments'])}.")
+
+    def replace(self, frames):
+        """
+        Replace the whole contents of the store with new data.
+
+        Every frame is written as its own segment, and the smallest segments are merged only when there are
+        more than MAX_SEGMENTS, so a chunked build never holds all rows in memory. The new segments are
+        published with a single metadata swap, so readers see either the old store or the new one. Old segment
+        files are removed afterwards.
+
+        Args:
+            frames (iterable): DataFrames (e.g. CSV chunks) making up the new contents.
+        """
+        with self._lock:
+            self._refresh()
+            os.makedirs(self.directory, exist_ok=True)
+            old_segments = self._meta["segments"]
+            meta, vehicle_codes = self._empty_meta(self._meta["next_segment"]), {}
+
+            segments = []
+            for df in frames:
+                records = self._to_records(df, meta, vehicle_codes) if not df.empty else []
+                if len(records):
+                    segments.append(self._write_segment(records, meta))
+            meta["segments"] = self._merge_smallest(segments, meta)
+            self._remove_segments([s for s in segments if s not in meta["segments"]])
+            segments = meta["segments"]
+
+            self._commit(meta, vehicle_codes)
+            self._remove_segments(old_segments)
+            print(f"Store {self.directory} replaced ({sum(s['rows'] for s in segments)} rows).")
+
+    def compact(self):
+        """
+        Merge all segments into a single sorted segment.
+
+        The merged rows are held in memory while the new segment is written.
+        """
+        with self._lock:
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        old_segments = self._meta["segments"]
+        if len(old_segments) <= 1:
+            return
+        meta = copy.deepcopy(self._meta)
+        meta["segments"] = [self._merge(old_segments, meta)]
+        self._commit(meta, self._vehicle_codes)
+        self._remove_segments(old_segments)
+        print(f"Compacted {len(old_segments)} segments into one ({meta['segments'][0]['rows']} rows).")
+
+    @staticmethod
+    def _vehicle_range(records, index, code, start_ns, end_ns, block_rows):
+        """
+        Return the rows of one vehicle within [start_ns, end_ns] from a single segment.
+        """
+        # Locate candidate blocks in the sparse index
+        lo = np.searchsorted(index["vehicle"], code, side='left')
+        hi = np.searchsorted(index["vehicle"], code, side='right')
+        block_ts = index["timestamp"][lo:hi]
+        first_block = max(lo + np.searchsorted(block_ts, start_ns, side='left') - 1, 0)
+        last_block = lo + np.searchsorted(block_ts, end_ns, side='right')
+        if last_block <= first_block:
+            return records[:0]
+
+        # Read only the candidate blocks and trim them to the exact range
+        blocks = records[first_block * block_rows:last_block * block_rows]
+        lo = np.searchsorted(blocks["vehicle"], code, side='left')
+        hi = np.searchsorted(blocks["vehicle"], code, side='right')
+        row_ts = blocks["timestamp"][lo:hi]
+        start = lo + np.searchsorted(row_ts, start_ns, side='left')
+        end = lo + np.searchsorted(row_ts, end_ns, side='right')
+        return blocks[start:end]
+
+    def _read(self, read_segments):
+        """
+        Run a read against the latest metadata, retrying once if a concurrent rebuild removed its segments.
+        """
+        try:
+            return read_segments(*self._snapshot())
+        except FileNotFoundError:
+            with self._lock:
+                self._meta_stamp = None
+            return read_segments(*self._snapshot())
+
+    def query(self, vehicle_id=None, start=None, end=None, columns=None):
+        """
+        Return the rows of a vehicle within a time range.
+
+        Args:
+            vehicle_id: Vehicle identifier. When None, all vehicles are scanned for the time range.
+            start: Inclusive start time (anything accepted by pd.Timestamp); open-ended when None.
+            end: Inclusive end time (anything accepted by pd.Timestamp); open-ended when None.
+            columns (list): Value columns to return; all columns when None.
+
+        Returns:
+            pd.DataFrame: Matching rows sorted by vehicle and timestamp.
+        """
+        start_ns = pd.Timestamp(start).value if start is not None else MIN_NS
+        end_ns = pd.Timestamp(end).value if end is not None else MAX_NS
+
+        def read_segments(meta, vehicle_codes):
+            segments = [
+                segment for segment in meta["segments"]
+                if segment["max_timestamp"] >= start_ns and segment["min_timestamp"] <= end_ns
+            ]
+            parts = []
+            if vehicle_id is not None and meta["vehicle_col"] is not None:
+                code = vehicle_codes.get(str(vehicle_id))
+                if code is not None:
+                    for segment in segments:
+                        records, index = self._segment(segment, meta)
+                        parts.append(np.array(self._vehicle_range(records, index, code, start_ns, end_ns,
+                                                                  meta["block_rows"])))
+            else:
+                for segment in segments:
+                    records, _ = self._segment(segment, meta)
+                    timestamps = records["timestamp"]
+                    parts.append(np.array(records[(timestamps >= start_ns) & (timestamps <= end_ns)]))
+
+            parts = [part for part in parts if len(part)]
+            if not parts:
+                records = np.empty(0, dtype=self._record_dtype(meta)) if meta["columns"] is not None else None
+            else:
+                records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+                if len(parts) > 1:
+                    records = records[np.lexsort((records["timestamp"], records["vehicle"]))]
+            return self._to_frame(records, meta, list(meta["columns"] or []) if columns is None else list(columns))
+
+        return self._read(read_segments)
+
+    @staticmethod
+    def _to_frame(records, meta, columns):
+        if records is None:
+            return pd.DataFrame(columns=[meta["time_col"]] + columns)
+        df = pd.DataFrame({col: records[col] for col in columns})
+        df.insert(0, meta["time_col"], pd.to_datetime(records["timestamp"]))
+        if meta["vehicle_col"] is not None:
+            vehicle_ids = np.asarray(meta["vehicles"], dtype=object)
+            df.insert(0, meta["vehicle_col"], vehicle_ids[records["vehicle"]])
+        return df
+
+    def time_bounds(self, vehicle_id=None):
+        """
+        Return the earliest and latest timestamps in the store, optionally for a single vehicle.
+
+        Store-wide bounds come from the segment metadata without reading any rows.
+
+        Returns:
+            tuple: (pd.Timestamp, pd.Timestamp), or (None, None) if there is no data.
+        """
+        def read_segments(meta, vehicle_codes):
+            if vehicle_id is None or meta["vehicle_col"] is None:
+                bounds = [(segment["min_timestamp"], segment["max_timestamp"]) for segment in meta["segments"]]
+            else:
+                code = vehicle_codes.get(str(vehicle_id))
+                bounds = []
+                for segment in meta["segments"] if code is not None else []:
+                    records, index = self._segment(segment, meta)
+                    rows = self._vehicle_range(records, index, code, MIN_NS, MAX_NS, meta["block_rows"])
+                    if len(rows):
+                        bounds.append((rows["timestamp"][0], rows["timestamp"][-1]))
+            if not bounds:
+                return None, None
+            return pd.Timestamp(min(b[0] for b in bounds)), pd.Timestamp(max(b[1] for b in bounds))
+
+        return self._read(read_segments)
+
+def save_to_store(df, store_dir, time_col=TIME_COL, vehicle_col=VEHICLE_ID_COL):
+    """
+    Write a DataFrame to a store, replacing any existing contents.
+
+    Args:
+        df (pd.DataFrame): Telemetry or engineered feature data.
+        store_dir (str): Directory of the store.
+        time_col (str): Name of the timestamp column.
+        vehicle_col (str): Name of the vehicle identifier column.
+
+    Returns:
+        TelemetryStore: The populated store.
+    """
+    store = TelemetryStore(store_dir, time_col=time_col, vehicle_col=vehicle_col)
+    store.replace([df])
+    print(f"Data saved to store {store_dir}")
+    return store
+
+def build_store_from_csv(csv_path, store_dir, time_col=TIME_COL, vehicle_col=VEHICLE_ID_COL,
+                         chunksize=CSV_CHUNK_SIZE):
+    """
+    Build a store from a CSV file, reading it in chunks.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+        store_dir (str): Directory of the store; existing contents are replaced.
+        time_col (str): Name of the timestamp column.
+        vehicle_col (str): Name of the vehicle identifier column.
+        chunksize (int): Rows read per chunk.
+
+    Returns:
+        TelemetryStore: The populated store, or None if the CSV file does not exist.
+    """
+    if not os.path.exists(csv_path):
+        print(f"File not found: {csv_path}")
+        return None
+    store = TelemetryStore(store_dir, time_col=time_col, vehicle_col=vehicle_col)
+    store.replace(pd.read_csv(csv_path, chunksize=chunksize))
+    print(f"Store built at {store_dir} from {csv_path}")
+    return store
+
+def main():
+    # Build stores from the existing cleaned telemetry and engineered feature files
+    build_store_from_csv("processed_data/cleaned_telemetry.csv", TELEMETRY_STORE_DIR)
+    build_store_from_csv("processed_data/engineered_features.csv", FEATURE_STORE_DIR)
+
+if __name__ == "__main__":
+    main()